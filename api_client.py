@@ -1,10 +1,21 @@
 """API client for ipcam-browser."""
 
+import json
+import os
+import shutil
 import tempfile
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Read size when streaming downloads to disk
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
 
 
 @dataclass
@@ -28,34 +39,88 @@ class MediaItem:
 class ApiClient:
     """Client for the ipcam-browser API."""
 
-    def __init__(self, base_url: str, timeout: int = 30):
+    def __init__(
+        self,
+        base_url: str,
+        timeout: int = 30,
+        concurrent_downloads: int = 5,
+        cache_file: str | Path | None = None,
+        download_dir: str | Path | None = None,
+    ):
         """Initialize the API client.
 
         Args:
             base_url: Base URL of the ipcam-browser API.
             timeout: Request timeout in seconds.
+            concurrent_downloads: Maximum number of simultaneous downloads.
+            cache_file: Optional file for caching the media list between runs.
+            download_dir: Directory for downloaded videos (None = the system
+                temp directory).
         """
         self.base_url = base_url.rstrip("/")
         self.timeout = timeout
+        self.concurrent_downloads = max(1, concurrent_downloads)
+        self.cache_file = Path(cache_file).expanduser() if cache_file else None
+        self.download_dir = Path(download_dir).expanduser() if download_dir else None
+        if self.download_dir:
+            self.download_dir.mkdir(parents=True, exist_ok=True)
         self._session = requests.Session()
 
+        self._session.headers.update(
+            {"Connection": "keep-alive", "Accept-Encoding": "gzip"}
+        )
+
+        # Reuse pooled connections across requests, and back off and retry
+        # when the server is overloaded or asks us to slow down
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=max(16, self.concurrent_downloads),
+            pool_block=False,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.3,
+                status_forcelist=[429, 502, 503, 504],
+            ),
+        )
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
     def get_videos(self) -> list[MediaItem]:
         """Fetch all video items from the API.
 
+        If a cache file is configured, the request is made conditional on
+        the cached ETag/Last-Modified, and the cached list is reused when
+        the server reports it unchanged.
+
         Returns:
             List of MediaItem objects for videos only.
 
         Raises:
             requests.RequestException: If the API request fails.
         """
+        cache = self._load_cache()
+        headers = {}
+        if cache:
+            if cache.get("etag"):
+                headers["If-None-Match"] = cache["etag"]
+            if cache.get("last_modified"):
+                headers["If-Modified-Since"] = cache["last_modified"]
+
         response = self._session.get(
             f"{self.base_url}/api/media",
+            headers=headers,
             timeout=self.timeout,
         )
-        response.raise_for_status()
+
+        if response.status_code == 304 and cache:
+            media = cache["media"]
+        else:
+            response.raise_for_status()
+            media = response.json()
+            self._save_cache(response, media)
 
         items = []
-        for item in response.json():
+        for item in media:
             if item.get("type") != "video":
                 continue
 
@@ -78,6 +143,53 @@ class ApiClient:
 
         return items
 
+    def _load_cache(self) -> dict | None:
+        """Load the cached media list, if there is a usable one."""
+        if not self.cache_file:
+            return None
+
+        try:
+            with open(self.cache_file) as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if not isinstance(cache, dict) or not isinstance(cache.get("media"), list):
+            return None
+        return cache
+
+    def _save_cache(self, response: requests.Response, media: list) -> None:
+        """Save the media list along with its cache validators."""
+        if not self.cache_file:
+            return
+
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            # Nothing to revalidate against; a cached copy would never be used
+            return
+
+        cache = {
+            "etag": etag,
+            "last_modified": last_modified,
+            "media": [item for item in media if item.get("type") == "video"],
+        }
+
+        # Write atomically so an interrupted run can't leave a corrupt cache.
+        # Caching is best-effort; a failure here shouldn't fail the fetch.
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_file.parent, suffix=".tmp")
+        except OSError:
+            return
+
+        try:
+            with open(fd, "w") as f:
+                json.dump(cache, f)
+            os.replace(temp_path, self.cache_file)
+        except OSError:
+            Path(temp_path).unlink(missing_ok=True)
+
     def download_video(self, proxy_url: str) -> Path:
         """Download a video via its proxy URL.
 
@@ -95,21 +207,64 @@ class ApiClient:
             raise ValueError("Empty proxy URL")
 
         url = f"{self.base_url}{proxy_url}"
-        response = self._session.get(url, timeout=self.timeout, stream=True)
-        response.raise_for_status()
+        # Closing the response returns its connection to the session's pool,
+        # including when the request fails partway
+        with self._session.get(url, timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
 
-        # Create temp file with .mp4 extension
-        fd, temp_path = tempfile.mkstemp(suffix=".mp4")
-        try:
-            with open(fd, "wb") as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-        except Exception:
-            Path(temp_path).unlink(missing_ok=True)
-            raise
+            # Create temp file with .mp4 extension
+            fd, temp_path = tempfile.mkstemp(suffix=".mp4", dir=self.download_dir)
+            try:
+                if hasattr(os, "posix_fadvise"):
+                    # The file is written front to back and then read sequentially
+                    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                with open(fd, "wb") as f:
+                    response.raw.decode_content = True
+                    shutil.copyfileobj(response.raw, f, length=DOWNLOAD_CHUNK_SIZE)
+            except Exception:
+                Path(temp_path).unlink(missing_ok=True)
+                raise
 
         return Path(temp_path)
 
+    def download_videos(
+        self, videos: list[MediaItem]
+    ) -> Iterator[tuple[MediaItem, Future[Path]]]:
+        """Download videos concurrently, yielding them in order.
+
+        At most concurrent_downloads videos are downloading or waiting to
+        be consumed at any time, which also bounds the number of temporary
+        files on disk. The caller owns (and must delete) each downloaded
+        file once its future has been yielded.
+
+        Args:
+            videos: MediaItems to download.
+
+        Yields:
+            (MediaItem, Future) pairs; the future resolves to the path of
+            the downloaded temporary file, or raises the download error.
+        """
+        pending: deque[tuple[MediaItem, Future[Path]]] = deque()
+        executor = ThreadPoolExecutor(max_workers=self.concurrent_downloads)
+
+        try:
+            for video in videos:
+                if len(pending) >= self.concurrent_downloads:
+                    yield pending.popleft()
+                pending.append(
+                    (video, executor.submit(self.download_video, video.proxy_url))
+                )
+
+            while pending:
+                yield pending.popleft()
+
+        finally:
+            # Abandoned early: stop queued downloads and remove finished ones
+            executor.shutdown(wait=True, cancel_futures=True)
+            for _, future in pending:
+                if not future.cancelled() and future.exception() is None:
+                    future.result().unlink(missing_ok=True)
+
     def close(self) -> None:
         """Close the session."""
         self._session.close()
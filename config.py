@@ -12,6 +12,9 @@ class ApiConfig:
 
     base_url: str
     timeout: int = 30
+    concurrent_downloads: int = 5
+    cache_file: str | None = None  # File for caching the media list between runs
+    download_dir: str | None = None  # Directory for downloads (None = system temp)
 
 
 @dataclass
@@ -23,6 +26,15 @@ class DetectionConfig:
     frame_times: list[float] = field(default_factory=lambda: [6.0])
     min_area_percent: float | None = None  # Minimum bird area as % of frame
     max_area_percent: float | None = None  # Maximum bird area as % of frame
+    batch_size: int = 8  # Maximum number of frames per inference call
+    extract_workers: int = 2  # Videos to extract frames from in parallel
+    device: str | None = None  # Inference device, e.g. "cpu" or "cuda:0"
+    half: bool | None = None  # FP16 inference (GPU only; None = if CUDA available)
+    hwaccel: str | None = None  # ffmpeg hardware decoding method, e.g. "auto"
+    backend: str = "torch"  # Inference backend: "torch", "onnx" or "engine"
+    skip_similar: int | None = None  # Max hash distance to skip as bird-free
+    input_size: int | list[int] | None = None  # Model input size, or [h, w]
+    processes: int = 1  # Worker processes, each with its own model (CPU)
 
 
 @dataclass
@@ -30,6 +42,7 @@ class DatabaseConfig:
     """Database configuration."""
 
     path: str = "bird_detections.db"
+    batch_size: int = 50  # Results to buffer before writing to the database
 
 
 @dataclass
@@ -82,6 +95,9 @@ def load_config(config_path: str | Path) -> Config:
     api_config = ApiConfig(
         base_url=api_data["base_url"].rstrip("/"),
         timeout=api_data.get("timeout", 30),
+        concurrent_downloads=api_data.get("concurrent_downloads", 5),
+        cache_file=api_data.get("cache_file"),
+        download_dir=api_data.get("download_dir"),
     )
 
     detection_data = data.get("detection", {})
@@ -96,17 +112,34 @@ def load_config(config_path: str | Path) -> Config:
     else:
         frame_times = [6.0]
 
+    backend = detection_data.get("backend", "torch")
+    if backend not in ("torch", "onnx", "engine"):
+        raise ValueError(
+            f"Invalid 'detection.backend' {backend!r}; "
+            "expected 'torch', 'onnx' or 'engine'"
+        )
+
     detection_config = DetectionConfig(
         model=detection_data.get("model", "yolo11n.pt"),
         confidence_threshold=detection_data.get("confidence_threshold", 0.5),
         frame_times=frame_times,
         min_area_percent=detection_data.get("min_area_percent"),
         max_area_percent=detection_data.get("max_area_percent"),
+        batch_size=detection_data.get("batch_size", 8),
+        extract_workers=detection_data.get("extract_workers", 2),
+        device=detection_data.get("device"),
+        half=detection_data.get("half"),
+        hwaccel=detection_data.get("hwaccel"),
+        backend=backend,
+        skip_similar=detection_data.get("skip_similar"),
+        input_size=detection_data.get("input_size"),
+        processes=max(1, detection_data.get("processes", 1)),
     )
 
     database_data = data.get("database", {})
     database_config = DatabaseConfig(
         path=database_data.get("path", "bird_detections.db"),
+        batch_size=database_data.get("batch_size", 50),
     )
 
     outputs_data = data.get("outputs", {})
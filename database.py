@@ -1,10 +1,13 @@
 """SQLite database operations for ipcam-bird-detection."""
 
+import logging
 import sqlite3
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
 
+logger = logging.getLogger(__name__)
+
 
 @dataclass
 class VideoRecord:
@@ -35,8 +38,19 @@ class Database:
         video_duration REAL,
         frame_time REAL
     );
-    CREATE INDEX IF NOT EXISTS idx_videos_filename ON videos(filename);
     CREATE INDEX IF NOT EXISTS idx_videos_has_bird ON videos(has_bird);
+    -- The UNIQUE constraint already indexes filename; this one only slowed
+    -- down inserts
+    DROP INDEX IF EXISTS idx_videos_filename;
+    """
+
+    # Videos that are already recorded (e.g. by a concurrent run) are skipped
+    # rather than failing the whole batch on the UNIQUE filename constraint
+    INSERT_SQL = """
+    INSERT OR IGNORE INTO videos (
+        filename, path, processed_at, has_bird,
+        confidence, bird_area_percent, video_duration, frame_time
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
     """
 
     def __init__(self, db_path: str | Path):
@@ -49,11 +63,30 @@ class Database:
         self._conn: sqlite3.Connection | None = None
 
     def connect(self) -> None:
-        """Open the database connection and ensure schema exists."""
-        self._conn = sqlite3.connect(self.db_path)
+        """Open the database connection and ensure schema exists.
+
+        The database is opened in WAL mode, so SQLite keeps -wal and -shm
+        sidecar files next to the database file while it is in use.
+        """
+        # Autocommit mode; transactions are managed explicitly where needed
+        self._conn = sqlite3.connect(
+            self.db_path,
+            isolation_level=None,
+            cached_statements=512,
+        )
         self._conn.row_factory = sqlite3.Row
+
+        journal_mode = self._conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+        if journal_mode.lower() != "wal":
+            logger.warning(
+                "Could not enable WAL mode for %s (journal_mode=%s)",
+                self.db_path,
+                journal_mode,
+            )
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA temp_store=MEMORY")
+        self._conn.execute("PRAGMA cache_size=-64000")  # 64 MB
         self._conn.executescript(self.SCHEMA)
-        self._conn.commit()
 
     def close(self) -> None:
         """Close the database connection."""
@@ -88,6 +121,19 @@ class Database:
         )
         return cursor.fetchone() is not None
 
+    def get_processed_filenames(self) -> set[str]:
+        """Get the filenames of all processed videos.
+
+        Returns:
+            Set of filenames in the database, for cheap membership checks
+            across many videos with a single query.
+        """
+        if not self._conn:
+            raise RuntimeError("Database not connected")
+
+        cursor = self._conn.execute("SELECT filename FROM videos")
+        return {row[0] for row in cursor}
+
     def insert_result(
         self,
         filename: str,
@@ -97,7 +143,7 @@ class Database:
         bird_area_percent: float | None = None,
         video_duration: float | None = None,
         frame_time: float | None = None,
-    ) -> None:
+    ) -> bool:
         """Insert a video processing result.
 
         Args:
@@ -108,29 +154,62 @@ class Database:
             bird_area_percent: Percentage of frame area (if bird found).
             video_duration: Video length in seconds.
             frame_time: Timestamp of extracted frame.
+
+        Returns:
+            True if the result was inserted, False if the video was already
+            in the database.
+        """
+        record = VideoRecord(
+            filename=filename,
+            path=path,
+            processed_at=datetime.now().isoformat(),
+            has_bird=has_bird,
+            confidence=confidence,
+            bird_area_percent=bird_area_percent,
+            video_duration=video_duration,
+            frame_time=frame_time,
+        )
+        return self.insert_results([record]) == 1
+
+    def insert_results(self, records: list[VideoRecord]) -> int:
+        """Insert multiple video processing results in a single transaction.
+
+        Args:
+            records: Records to insert.
+
+        Returns:
+            Number of records inserted; videos already in the database are
+            skipped.
         """
         if not self._conn:
             raise RuntimeError("Database not connected")
 
-        self._conn.execute(
-            """
-            INSERT INTO videos (
-                filename, path, processed_at, has_bird,
-                confidence, bird_area_percent, video_duration, frame_time
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """,
+        if not records:
+            return 0
+
+        rows = [
             (
-                filename,
-                path,
-                datetime.now().isoformat(),
-                1 if has_bird else 0,
-                confidence,
-                bird_area_percent,
-                video_duration,
-                frame_time,
-            ),
-        )
-        self._conn.commit()
+                r.filename,
+                r.path,
+                r.processed_at,
+                1 if r.has_bird else 0,
+                r.confidence,
+                r.bird_area_percent,
+                r.video_duration,
+                r.frame_time,
+            )
+            for r in records
+        ]
+
+        self._conn.execute("BEGIN")
+        try:
+            cursor = self._conn.executemany(self.INSERT_SQL, rows)
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+        return cursor.rowcount
 
     def get_stats(self) -> dict:
         """Get summary statistics.
@@ -1,13 +1,21 @@
 """Bird detection using Ultralytics YOLO."""
 
+import hashlib
+import os
 from dataclasses import dataclass
 from pathlib import Path
 
+import numpy as np
+import torch
 from ultralytics import YOLO
+from ultralytics.cfg import DEFAULT_CFG_DICT
 
 # COCO class ID for "bird"
 BIRD_CLASS_ID = 14
 
+# File suffixes of models exported for each non-PyTorch inference backend
+EXPORT_SUFFIXES = {"onnx": ".onnx", "engine": ".engine"}
+
 
 @dataclass
 class DetectionResult:
@@ -18,6 +26,102 @@ class DetectionResult:
     bird_area_percent: float | None = None
 
 
+def _use_half(half: bool | None, device: str | None) -> bool:
+    """Resolve the half setting for a device.
+
+    FP16 is never used on the CPU. Otherwise None means whenever CUDA is
+    available.
+    """
+    if device is not None and str(device).lower() == "cpu":
+        return False
+    return torch.cuda.is_available() if half is None else half
+
+
+def _precision_args(half: bool) -> dict:
+    """Ultralytics arguments selecting FP16 inference, if wanted.
+
+    FP32 is the default, so nothing is passed for it. Newer Ultralytics
+    versions deprecate half in favor of quantize.
+    """
+    if not half:
+        return {}
+    if "quantize" in DEFAULT_CFG_DICT:
+        return {"quantize": 16}
+    return {"half": True}
+
+
+def export_model(
+    model_path: str,
+    backend: str,
+    batch_size: int = 8,
+    device: str | None = None,
+    half: bool | None = None,
+    input_size: int | list[int] | None = None,
+) -> str:
+    """Export a YOLO model for an inference backend, reusing earlier exports.
+
+    TensorRT engines only accept exactly batch_size images of exactly the
+    input size; ONNX models accept up to batch_size images of any size.
+
+    The exported model is saved next to the original, with the settings it
+    was exported with in its name, e.g. yolo11n-1a2b3c4d-b8-fp16-384x640.onnx
+    for yolo11n.pt (1a2b3c4d identifies the weights). Changing the weights or
+    any of those settings therefore exports a new model rather than reusing
+    a stale one. A model_path that already is an export for backend is
+    returned as is.
+
+    Args:
+        model_path: Path to YOLO model or model name.
+        backend: Ultralytics export format ("onnx" or "engine").
+        batch_size: Largest batch the exported model accepts.
+        device: Device to export for (None = pick automatically).
+        half: Export for FP16 inference (never on the CPU; None = whenever
+            CUDA is available).
+        input_size: Model input size, as a side length or [height, width]
+            (None = the model's default).
+
+    Returns:
+        Path to the exported model.
+    """
+    suffix = EXPORT_SUFFIXES[backend]
+    if Path(model_path).suffix == suffix:
+        return model_path
+
+    model = YOLO(model_path)  # Downloads the weights if needed
+    weights = Path(getattr(model, "ckpt_path", None) or model_path)
+    digest = ""
+    if weights.is_file():
+        digest = "-" + hashlib.sha256(weights.read_bytes()).hexdigest()[:8]
+
+    half = _use_half(half, device)
+    if input_size is None:
+        input_size = DEFAULT_CFG_DICT["imgsz"]
+    height, width = input_size if isinstance(input_size, list) else (input_size,) * 2
+
+    exported = weights.with_name(
+        f"{weights.stem}{digest}-b{batch_size}-{'fp16' if half else 'fp32'}"
+        f"-{height}x{width}{suffix}"
+    )
+    if exported.exists():
+        return str(exported)
+
+    output = model.export(
+        format=backend,
+        batch=batch_size,
+        # TensorRT builds kernels specialized for one fixed input shape, so
+        # BirdDetector pads smaller batches to batch_size. ONNX Runtime gains
+        # little from that, so ONNX exports accept any batch size instead.
+        dynamic=backend != "engine",
+        imgsz=[height, width],
+        device=device,
+        **_precision_args(half),
+    )
+    # Ultralytics writes to a fixed name next to the weights; only move the
+    # export to its final name once it's complete
+    os.replace(output, exported)
+    return str(exported)
+
+
 class BirdDetector:
     """Detect birds in images using YOLO."""
 
@@ -27,6 +131,12 @@ class BirdDetector:
         confidence_threshold: float = 0.5,
         min_area_percent: float | None = None,
         max_area_percent: float | None = None,
+        batch_size: int = 8,
+        device: str | None = None,
+        half: bool | None = None,
+        backend: str = "torch",
+        input_size: int | list[int] | None = None,
+        threads: int | None = None,
     ):
         """Initialize the detector.
 
@@ -35,76 +145,164 @@ class BirdDetector:
             confidence_threshold: Minimum confidence for detections.
             min_area_percent: Minimum bird area as % of frame (None = no minimum).
             max_area_percent: Maximum bird area as % of frame (None = no maximum).
+            batch_size: Maximum number of images per inference call.
+            device: Device to run inference on, e.g. "cpu", "cuda:0" or "mps"
+                (None = pick automatically).
+            half: Use FP16 inference (never on the CPU; None = use it
+                whenever CUDA is available).
+            backend: Inference backend: "torch" (run the model as is), "onnx"
+                (ONNX Runtime) or "engine" (TensorRT).
+            input_size: Size images are resized to for the model, as a single
+                side length or [height, width] (None = the model's default).
+            threads: Maximum number of CPU threads for inference (None = all
+                cores).
         """
-        self.model = YOLO(model_path)
+        if threads:
+            torch.set_num_threads(threads)
+
+        self.batch_size = max(1, batch_size)
+        self.device = device
+        self.half = _use_half(half, device)
+
+        # Arguments for every inference call
+        self.predict_args = {"device": self.device, **_precision_args(self.half)}
+        if input_size is not None:
+            self.predict_args["imgsz"] = input_size
+
+        if backend == "torch":
+            self.model = YOLO(model_path)
+            if device:
+                self.model.to(device)
+        else:
+            exported = export_model(
+                model_path, backend, self.batch_size, device, self.half, input_size
+            )
+            self.model = YOLO(exported, task="detect")
+
+        # Static TensorRT engines only accept full batches
+        self.pad_batches = backend == "engine"
+
         self.confidence_threshold = confidence_threshold
         self.min_area_percent = min_area_percent
         self.max_area_percent = max_area_percent
 
-    def detect(self, image_path: Path) -> DetectionResult:
+        # Run one throwaway inference so model setup (layer fusing, moving
+        # weights to the device, CUDA context and kernel selection) happens
+        # now rather than during the first real detection
+        self.detect(np.zeros((640, 640, 3), dtype=np.uint8))
+
+        if threads and backend == "onnx":
+            # The warm-up created the ONNX Runtime session
+            self._limit_onnx_threads(exported, threads)
+
+    def _limit_onnx_threads(self, model_file: str, threads: int) -> None:
+        """Recreate the ONNX Runtime session with a CPU thread limit.
+
+        torch.set_num_threads doesn't apply to ONNX Runtime, whose sessions
+        use every core by default, and Ultralytics doesn't expose its session
+        options. Only CPU sessions are recreated.
+
+        Args:
+            model_file: Path to the ONNX model.
+            threads: Maximum number of threads.
+        """
+        import onnxruntime  # Installed by Ultralytics for the onnx backend
+
+        autobackend = self.model.predictor.model
+        # Ultralytics 8.4+ keeps the session on a per-format backend object
+        owner = getattr(autobackend, "backend", autobackend)
+        if owner.session.get_providers() != ["CPUExecutionProvider"]:
+            return
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        owner.session = onnxruntime.InferenceSession(
+            model_file, options, providers=["CPUExecutionProvider"]
+        )
+
+    def detect(self, image: np.ndarray) -> DetectionResult:
         """Detect birds in an image.
 
         Args:
-            image_path: Path to the image file.
+            image: The image (height x width x 3, BGR).
 
         Returns:
             DetectionResult with detection info.
         """
-        # Run inference
-        results = self.model(str(image_path), verbose=False)
+        return self.detect_batch([image])[0]
 
-        if not results or len(results) == 0:
-            return DetectionResult(has_bird=False)
+    def detect_batch(self, images: list[np.ndarray]) -> list[DetectionResult]:
+        """Detect birds in several images.
+
+        Images are run through the model batch_size at a time, which
+        amortizes per-call preprocessing and inference overhead.
+
+        Args:
+            images: The images (height x width x 3, BGR).
 
-        result = results[0]
+        Returns:
+            DetectionResult for each image, in the same order as images.
+        """
+        detections = []
+        for i in range(0, len(images), self.batch_size):
+            batch = images[i : i + self.batch_size]
+            count = len(batch)
+            if self.pad_batches:
+                batch = batch + [batch[-1]] * (self.batch_size - count)
+            results = self.model(
+                batch,
+                verbose=False,
+                batch=len(batch),
+                **self.predict_args,
+            )
+            detections.extend(self._parse_result(result) for result in results[:count])
+        return detections
+
+    def _parse_result(self, result) -> DetectionResult:
+        """Find the largest qualifying bird in a single YOLO result.
+
+        Args:
+            result: Ultralytics Results object for one image.
+
+        Returns:
+            DetectionResult with detection info.
+        """
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            return DetectionResult(has_bird=False)
 
         # Get image dimensions for area calculation
         img_height, img_width = result.orig_shape
 
-        # Filter for bird detections above threshold
-        birds = []
-        for box in result.boxes:
-            cls_id = int(box.cls.item())
-            conf = float(box.conf.item())
-
-            if cls_id == BIRD_CLASS_ID and conf >= self.confidence_threshold:
-                # Get bounding box coordinates (xyxy format)
-                xyxy = box.xyxy[0].tolist()
-                x1, y1, x2, y2 = xyxy
-
-                # Calculate area
-                bird_area = (x2 - x1) * (y2 - y1)
-                frame_area = img_width * img_height
-                area_percent = (bird_area / frame_area) * 100
-
-                # Filter by area thresholds
-                if (
-                    self.min_area_percent is not None
-                    and area_percent < self.min_area_percent
-                ):
-                    continue
-                if (
-                    self.max_area_percent is not None
-                    and area_percent > self.max_area_percent
-                ):
-                    continue
-
-                birds.append(
-                    {
-                        "confidence": conf,
-                        "area_percent": area_percent,
-                        "area": bird_area,
-                    }
-                )
-
-        if not birds:
-            return DetectionResult(has_bird=False)
+        # Compute areas for all boxes at once (xyxy format). With FP16
+        # inference the boxes are float16, which overflows to inf for areas
+        # above 65504 px, so do the math in float32.
+        xyxy = boxes.xyxy.float()
+        conf = boxes.conf.float()
+        areas = (xyxy[:, 2] - xyxy[:, 0]) * (xyxy[:, 3] - xyxy[:, 1])
+        area_percents = areas / (img_width * img_height) * 100
 
-        # Find the largest bird by area
-        largest_bird = max(birds, key=lambda b: b["area"])
+        # Filter for bird detections above threshold and within area thresholds
+        mask = (boxes.cls == BIRD_CLASS_ID) & (conf >= self.confidence_threshold)
+        if self.min_area_percent is not None:
+            mask &= area_percents >= self.min_area_percent
+        if self.max_area_percent is not None:
+            mask &= area_percents <= self.max_area_percent
+
+        # Find the largest bird by area; filtered-out boxes get area -1.
+        # Everything stays on the model's device until this single transfer.
+        candidate_areas = torch.where(mask, areas, -1.0)
+        largest = candidate_areas.argmax()
+        largest_area, confidence, area_percent = torch.stack(
+            [candidate_areas[largest], conf[largest], area_percents[largest]]
+        ).tolist()
+
+        if largest_area < 0:
+            return DetectionResult(has_bird=False)
 
         return DetectionResult(
             has_bird=True,
-            confidence=largest_bird["confidence"],
-            bird_area_percent=largest_bird["area_percent"],
+            confidence=confidence,
+            bird_area_percent=area_percent,
         )
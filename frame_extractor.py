@@ -1,12 +1,27 @@
 """Video frame extraction using ffmpeg."""
 
-import json
-import os
+import re
 import subprocess
-import tempfile
 from dataclasses import dataclass
 from pathlib import Path
 
+import numpy as np
+
+__all__ = [
+    "ExtractionResult",
+    "FrameExtractionError",
+    "MultiFrameExtractionResult",
+    "extract_frame",
+    "extract_frames",
+    "get_video_duration",
+]
+
+# Matches the input duration ffmpeg logs, e.g. "Duration: 00:00:20.35"
+DURATION_RE = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+
+# Matches the output frame size ffmpeg logs, e.g. "bgr24(progressive), 1920x1080"
+OUTPUT_SIZE_RE = re.compile(r"Output #0.*?, (\d+)x(\d+)", re.DOTALL)
+
 
 class FrameExtractionError(Exception):
     """Error during frame extraction."""
@@ -16,7 +31,7 @@ class FrameExtractionError(Exception):
 class ExtractionResult:
     """Result of frame extraction."""
 
-    frame_path: Path
+    frame: np.ndarray  # Decoded frame (height x width x 3, BGR)
     duration: float
     frame_time: float
 
@@ -44,26 +59,129 @@ def get_video_duration(video_path: Path) -> float:
     cmd = [
         "ffprobe",
         "-v",
-        "quiet",
-        "-print_format",
-        "json",
-        "-show_format",
+        "error",
+        "-show_entries",
+        "format=duration",
+        "-of",
+        "csv=p=0",  # Just the value, no section name or JSON to parse
         str(video_path),
     ]
 
     try:
         result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        data = json.loads(result.stdout)
-        duration_str = data.get("format", {}).get("duration")
-        if duration_str is None:
-            raise FrameExtractionError("Could not determine video duration")
-        return float(duration_str)
     except subprocess.CalledProcessError as e:
         raise FrameExtractionError(f"ffprobe failed: {e.stderr}") from e
-    except (json.JSONDecodeError, KeyError, ValueError) as e:
+
+    duration_str = result.stdout.strip()
+    if not duration_str or duration_str == "N/A":
+        raise FrameExtractionError("Could not determine video duration")
+
+    try:
+        return float(duration_str)
+    except ValueError as e:
         raise FrameExtractionError(f"Failed to parse ffprobe output: {e}") from e
 
 
+def _parse_duration(ffmpeg_output: str) -> float | None:
+    """Parse the input video duration from ffmpeg's log output.
+
+    Args:
+        ffmpeg_output: ffmpeg's stderr.
+
+    Returns:
+        Duration in seconds, or None if it wasn't reported.
+    """
+    match = DURATION_RE.search(ffmpeg_output)
+    if match is None:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def _unique_times(times: list[float]) -> list[float]:
+    """Sort times, dropping any within 0.1s of the previous kept time."""
+    unique: list[float] = []
+    for t in sorted(times):
+        if not unique or t - unique[-1] >= 0.1:
+            unique.append(t)
+    return unique
+
+
+def _extract_raw(
+    video_path: Path, frame_times: list[float], hwaccel: str | None = None
+) -> tuple[list[np.ndarray], str]:
+    """Decode one frame per frame time with a single ffmpeg invocation.
+
+    The video is opened once per frame time as a separate ffmpeg input, each
+    using fast input-side seeking. The first frame of each input is
+    concatenated into a single raw BGR stream on ffmpeg's stdout, so frames
+    go straight into memory with no image encoding or temp files.
+
+    Args:
+        video_path: Path to the video file.
+        frame_times: Times in seconds to extract frames at, in ascending order.
+        hwaccel: ffmpeg hardware decoding method (e.g. "auto", "cuda"), or
+            None to decode in software.
+
+    Returns:
+        The decoded frames (height x width x 3, BGR), in the same order as
+        frame_times, and ffmpeg's log output. Times past the end of the video
+        produce no frame, so fewer frames than frame_times may be returned;
+        since frame_times is sorted, those missing are always at the end.
+
+    Raises:
+        FrameExtractionError: If ffmpeg fails.
+    """
+    video = str(video_path)
+    cmd = ["ffmpeg", "-hide_banner"]
+    for frame_time in frame_times:
+        if hwaccel:
+            cmd += ["-hwaccel", hwaccel]
+        # Only the video stream is needed; don't demux audio/subtitles/data
+        cmd += ["-an", "-sn", "-dn", "-ss", str(frame_time), "-i", video]
+
+    # Keep the first frame of each input and join them into one stream
+    filters = [
+        f"[{i}:v:0]trim=end_frame=1,setpts=PTS-STARTPTS[v{i}]"
+        for i in range(len(frame_times))
+    ]
+    inputs = "".join(f"[v{i}]" for i in range(len(frame_times)))
+    filters.append(f"{inputs}concat=n={len(frame_times)}:v=1:a=0[out]")
+    cmd += [
+        "-filter_complex",
+        ";".join(filters),
+        "-map",
+        "[out]",
+        "-fps_mode",
+        "passthrough",  # Don't duplicate or drop frames
+        "-f",
+        "rawvideo",
+        "-pix_fmt",
+        "bgr24",  # What the detector expects
+        "pipe:1",
+    ]
+
+    result = subprocess.run(cmd, capture_output=True, check=False)
+    stderr = result.stderr.decode(errors="replace")
+    if result.returncode != 0:
+        raise FrameExtractionError(f"ffmpeg failed: {stderr}")
+
+    if not result.stdout:
+        return [], stderr
+
+    match = OUTPUT_SIZE_RE.search(stderr)
+    if match is None:
+        raise FrameExtractionError("Could not determine frame size")
+    width, height = int(match.group(1)), int(match.group(2))
+
+    frame_size = width * height * 3
+    if len(result.stdout) % frame_size != 0:
+        raise FrameExtractionError("ffmpeg produced a truncated frame")
+
+    frames = np.frombuffer(result.stdout, dtype=np.uint8).reshape(-1, height, width, 3)
+    return list(frames), stderr
+
+
 def extract_frame(
     video_path: Path,
     target_time: float = 6.0,
@@ -77,72 +195,35 @@ def extract_frame(
         target_time: Target time in seconds (default 6.0).
 
     Returns:
-        ExtractionResult with frame path, duration, and actual frame time.
+        ExtractionResult with frame, duration, and actual frame time.
 
     Raises:
         FrameExtractionError: If extraction fails.
     """
-    duration = get_video_duration(video_path)
-
-    # Determine actual frame time
-    if duration < target_time:
-        frame_time = duration * 0.5
-    else:
-        frame_time = target_time
-
-    # Create temp file for the frame
-    fd, frame_path = tempfile.mkstemp(suffix=".jpg")
-    os.close(fd)
-    frame_path = Path(frame_path)
-
-    cmd = [
-        "ffmpeg",
-        "-y",  # Overwrite output
-        "-ss",
-        str(frame_time),
-        "-i",
-        str(video_path),
-        "-frames:v",
-        "1",
-        "-q:v",
-        "2",  # High quality JPEG
-        str(frame_path),
-    ]
-
-    try:
-        subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            check=True,
-        )
-    except subprocess.CalledProcessError as e:
-        frame_path.unlink(missing_ok=True)
-        raise FrameExtractionError(f"ffmpeg failed: {e.stderr}") from e
-
-    if not frame_path.exists() or frame_path.stat().st_size == 0:
-        frame_path.unlink(missing_ok=True)
-        raise FrameExtractionError("ffmpeg produced no output")
-
-    return ExtractionResult(
-        frame_path=frame_path,
-        duration=duration,
-        frame_time=frame_time,
-    )
+    return extract_frames(video_path, [target_time]).frames[0]
 
 
 def extract_frames(
     video_path: Path,
     target_times: list[float],
+    hwaccel: str | None = None,
 ) -> MultiFrameExtractionResult:
     """Extract multiple frames from a video.
 
     For each target time, extracts the frame at that time, or at 50% of
-    video duration if the video is shorter than the target time.
+    video duration if the video is shorter than the target time. Frames
+    are returned in time order, skipping any within 0.1s of another.
+
+    Frames are first extracted at the requested times by a single ffmpeg
+    process, which also reports the video duration, so no separate ffprobe
+    run is needed. Only if some target times turn out to be past the end of
+    the video is ffmpeg run a second time to extract the fallback frame.
 
     Args:
         video_path: Path to the video file.
         target_times: List of target times in seconds.
+        hwaccel: ffmpeg hardware decoding method (e.g. "auto", "cuda"), or
+            None to decode in software.
 
     Returns:
         MultiFrameExtractionResult with list of frames and video duration.
@@ -150,68 +231,38 @@ def extract_frames(
     Raises:
         FrameExtractionError: If extraction fails.
     """
-    duration = get_video_duration(video_path)
-    frames = []
-
-    for target_time in target_times:
-        # Determine actual frame time
-        if duration < target_time:
-            frame_time = duration * 0.5
-        else:
-            frame_time = target_time
-
-        # Skip if we already extracted a frame at this time
-        if any(abs(f.frame_time - frame_time) < 0.1 for f in frames):
-            continue
-
-        # Create temp file for the frame
-        fd, frame_path = tempfile.mkstemp(suffix=".jpg")
-        os.close(fd)
-        frame_path = Path(frame_path)
-
-        cmd = [
-            "ffmpeg",
-            "-y",
-            "-ss",
-            str(frame_time),
-            "-i",
-            str(video_path),
-            "-frames:v",
-            "1",
-            "-q:v",
-            "2",
-            str(frame_path),
-        ]
-
-        try:
-            subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                check=True,
-            )
-        except subprocess.CalledProcessError as e:
-            # Clean up any frames we've extracted so far
-            for f in frames:
-                f.frame_path.unlink(missing_ok=True)
-            frame_path.unlink(missing_ok=True)
-            raise FrameExtractionError(f"ffmpeg failed: {e.stderr}") from e
-
-        if not frame_path.exists() or frame_path.stat().st_size == 0:
-            for f in frames:
-                f.frame_path.unlink(missing_ok=True)
-            frame_path.unlink(missing_ok=True)
-            raise FrameExtractionError("ffmpeg produced no output")
-
-        frames.append(
+    requested = _unique_times(target_times)
+    if requested:
+        extracted, ffmpeg_output = _extract_raw(video_path, requested, hwaccel)
+    else:
+        extracted, ffmpeg_output = [], ""
+    frames_by_time = dict(zip(requested, extracted))
+
+    duration = _parse_duration(ffmpeg_output)
+    if duration is None:
+        duration = get_video_duration(video_path)
+
+    # Determine actual frame times
+    frame_times = _unique_times(
+        [t if duration >= t else duration * 0.5 for t in target_times]
+    )
+
+    missing = [t for t in frame_times if t not in frames_by_time]
+    if missing:
+        extracted, _ = _extract_raw(video_path, missing, hwaccel)
+        frames_by_time.update(zip(missing, extracted))
+
+    if any(t not in frames_by_time for t in frame_times):
+        raise FrameExtractionError("ffmpeg produced no output")
+
+    return MultiFrameExtractionResult(
+        frames=[
             ExtractionResult(
-                frame_path=frame_path,
+                frame=frames_by_time[t],
                 duration=duration,
-                frame_time=frame_time,
+                frame_time=t,
             )
-        )
-
-    return MultiFrameExtractionResult(
-        frames=frames,
+            for t in frame_times
+        ],
         duration=duration,
     )
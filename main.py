@@ -2,15 +2,27 @@
 """Main entry point for ipcam-bird-detection."""
 
 import argparse
+import dataclasses
+import itertools
 import logging
+import multiprocessing
+import os
 import shutil
+import signal
 import sys
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from contextlib import closing
+from datetime import datetime
 from pathlib import Path
 
 from api_client import ApiClient, MediaItem
 from config import load_config
-from database import Database
-from pipeline import DetectionPipeline
+from database import Database, VideoRecord
+from detector import export_model
+from frame_extractor import MultiFrameExtractionResult
+from pipeline import DetectionPipeline, PipelineResult
 
 # Version is injected at build time by the Dockerfile
 VERSION = "<dev>"
@@ -33,69 +45,361 @@ def test_video(video_path: Path, pipeline: DetectionPipeline) -> int:
         Exit code (0 for success, 1 for failure).
     """
     if not video_path.exists():
-        logger.error(f"Video file not found: {video_path}")
+        logger.error("Video file not found: %s", video_path)
         return 1
 
-    logger.info(f"Testing video: {video_path}")
+    logger.info("Testing video: %s", video_path)
     result = pipeline.process(video_path)
 
     if not result.success:
-        logger.error(f"Pipeline failed: {result.error}")
+        logger.error("Pipeline failed: %s", result.error)
         return 1
 
     logger.info("=" * 50)
     logger.info("Detection Results")
     logger.info("=" * 50)
-    logger.info(f"  Video duration: {result.video_duration:.2f}s")
-    logger.info(f"  Frame extracted at: {result.frame_time:.2f}s")
-    logger.info(f"  Bird detected: {result.has_bird}")
+    logger.info("  Video duration: %.2fs", result.video_duration)
+    logger.info("  Frame extracted at: %.2fs", result.frame_time)
+    logger.info("  Bird detected: %s", result.has_bird)
 
     if result.has_bird:
-        logger.info(f"  Confidence: {result.confidence:.3f}")
-        logger.info(f"  Bird area: {result.bird_area_percent:.2f}% of frame")
+        logger.info("  Confidence: %.3f", result.confidence)
+        logger.info("  Bird area: %.2f%% of frame", result.bird_area_percent)
 
     return 0
 
 
-def process_video_from_api(
-    video: MediaItem,
-    api_client: ApiClient,
+# A video from the API, with its download and frame extraction futures
+VideoJob = tuple[MediaItem, Future[Path], Future[MultiFrameExtractionResult]]
+
+# A video from the API, with its download future and the future of its
+# result from a worker process
+WorkerJob = tuple[MediaItem, Future[Path], Future[PipelineResult]]
+
+# This worker process's pipeline, set up by init_worker
+_worker_pipeline: DetectionPipeline | None = None
+
+
+def create_pipeline(config, threads: int | None = None) -> DetectionPipeline:
+    """Create the detection pipeline described by the configuration.
+
+    Args:
+        config: Application configuration.
+        threads: Maximum number of CPU threads for inference (None = all cores).
+
+    Returns:
+        Detection pipeline instance.
+    """
+    return DetectionPipeline(
+        model_path=config.detection.model,
+        confidence_threshold=config.detection.confidence_threshold,
+        frame_times=config.detection.frame_times,
+        min_area_percent=config.detection.min_area_percent,
+        max_area_percent=config.detection.max_area_percent,
+        batch_size=config.detection.batch_size,
+        device=config.detection.device,
+        half=config.detection.half,
+        hwaccel=config.detection.hwaccel,
+        backend=config.detection.backend,
+        skip_similar=config.detection.skip_similar,
+        input_size=config.detection.input_size,
+        threads=threads,
+    )
+
+
+def extract_video(
+    download: Future[Path], pipeline: DetectionPipeline
+) -> MultiFrameExtractionResult:
+    """Wait for a video to download, then extract its frames.
+
+    Args:
+        download: Future resolving to the downloaded video's temporary path.
+        pipeline: Detection pipeline instance.
+
+    Returns:
+        Extracted frames, ready for detection.
+    """
+    return pipeline.extract(download.result())
+
+
+def discard_video_job(job: VideoJob | WorkerJob) -> None:
+    """Delete a video job's downloaded video.
+
+    Safe to call for jobs that have already been processed or cleaned up.
+
+    Args:
+        job: The job to discard.
+    """
+
+    def discard_download(future: Future[Path]) -> None:
+        if not future.cancelled() and future.exception() is None:
+            future.result().unlink(missing_ok=True)
+
+    _, download, _ = job
+    # Runs immediately if done, otherwise as soon as the future finishes
+    download.add_done_callback(discard_download)
+
+
+def extract_in_background(
+    downloads: Iterator[tuple[MediaItem, Future[Path]]],
     pipeline: DetectionPipeline,
-    db: Database,
+    workers: int,
+    max_batch: int,
+) -> Iterator[list[VideoJob]]:
+    """Extract frames from downloaded videos on a thread pool.
+
+    Up to max(workers, 2 * max_batch) videos are queued for frame
+    extraction ahead of detection, so ffmpeg runs while the detector is
+    busy with earlier videos and a full batch can finish extracting while
+    the previous one is being detected. Jobs are yielded in order, grouped
+    into batches for detection: the oldest job, plus any following jobs
+    whose extraction has already finished, up to max_batch jobs. The
+    caller owns each yielded job's files.
+
+    Args:
+        downloads: (MediaItem, download future) pairs, e.g. from
+            ApiClient.download_videos.
+        pipeline: Detection pipeline instance.
+        workers: Number of extraction threads.
+        max_batch: Maximum number of jobs per yielded batch.
+
+    Yields:
+        Lists of VideoJobs.
+    """
+    jobs: deque[VideoJob] = deque()
+    workers = max(1, workers)
+    executor = ThreadPoolExecutor(max_workers=workers)
+    lookahead = max(workers, 2 * max_batch)
+
+    def next_batch() -> list[VideoJob]:
+        wait([jobs[0][2]])
+        batch = []
+        while jobs and len(batch) < max_batch and jobs[0][2].done():
+            batch.append(jobs.popleft())
+        return batch
+
+    try:
+        for video, download in downloads:
+            jobs.append(
+                (video, download, executor.submit(extract_video, download, pipeline))
+            )
+            if len(jobs) >= lookahead:
+                yield next_batch()
+
+        while jobs:
+            yield next_batch()
+
+    finally:
+        # Abandoned early: stop queued extractions and clean up the rest
+        executor.shutdown(wait=True, cancel_futures=True)
+        for job in jobs:
+            discard_video_job(job)
+
+
+def init_worker(config, threads: int) -> None:
+    """Set up a worker process for detect_in_processes.
+
+    Args:
+        config: Application configuration.
+        threads: Number of threads the worker's model may use.
+    """
+    global _worker_pipeline
+    # Interrupts are handled by the main process, which shuts the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _worker_pipeline = create_pipeline(config, threads)
+
+
+def process_in_worker(video_path: Path) -> PipelineResult:
+    """Run a video through this worker process's pipeline.
+
+    Args:
+        video_path: Path to the video file.
+
+    Returns:
+        PipelineResult with detection results or error info.
+    """
+    return _worker_pipeline.process(video_path)
+
+
+def detect_in_processes(
+    downloads: Iterator[tuple[MediaItem, Future[Path]]],
+    config,
+) -> Iterator[list[WorkerJob]]:
+    """Extract frames and detect birds in downloaded videos on worker processes.
+
+    Each of the detection.processes workers loads its own copy of the model
+    and handles whole videos, so only paths and results cross between
+    processes. The available CPU threads are split between the workers.
+    Models for the onnx and engine backends are exported here, once, before
+    the workers start. This scales CPU-only inference better than one model
+    using every core. Jobs are yielded in order, one per batch, and up to
+    twice as many videos as there are workers are in flight at a time. The
+    caller owns each yielded job's files.
+
+    Args:
+        downloads: (MediaItem, download future) pairs, e.g. from
+            ApiClient.download_videos.
+        config: Application configuration.
+
+    Yields:
+        Single-job lists of WorkerJobs.
+    """
+    detection = config.detection
+    if detection.backend != "torch":
+        # Workers exporting for themselves would all write the same file
+        model = export_model(
+            detection.model,
+            detection.backend,
+            detection.batch_size,
+            detection.device,
+            detection.half,
+            detection.input_size,
+        )
+        config = dataclasses.replace(
+            config, detection=dataclasses.replace(detection, model=model)
+        )
+
+    processes = detection.processes
+    jobs: deque[WorkerJob] = deque()
+    executor = ProcessPoolExecutor(
+        max_workers=processes,
+        # Download threads are running, which makes forking unsafe
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker,
+        initargs=(config, max(1, (os.cpu_count() or 1) // processes)),
+    )
+
+    try:
+        for video, download in downloads:
+            # Queued before waiting on the download, so an interrupt while
+            # waiting still cleans it up
+            jobs.append((video, download, Future()))
+            try:
+                jobs[-1] = (
+                    video,
+                    download,
+                    executor.submit(process_in_worker, download.result()),
+                )
+            except Exception as e:
+                # The download failed; process_videos_in_workers reports it
+                jobs[-1][2].set_exception(e)
+
+            if len(jobs) >= 2 * processes:
+                yield [jobs.popleft()]
+
+        while jobs:
+            yield [jobs.popleft()]
+
+    finally:
+        # Abandoned early: stop queued videos and clean up the rest
+        executor.shutdown(wait=True, cancel_futures=True)
+        for job in jobs:
+            discard_video_job(job)
+
+
+def process_videos_in_workers(
+    jobs: list[WorkerJob],
     output_dir: Path | None = None,
-) -> bool:
-    """Process a single video from the API.
+) -> list[VideoRecord | None]:
+    """Handle the results of a batch of videos from detect_in_processes.
 
     Args:
-        video: MediaItem to process.
-        api_client: API client for downloading.
+        jobs: WorkerJobs from detect_in_processes.
+        output_dir: Optional directory to save videos with birds.
+
+    Returns:
+        VideoRecord to store for each job, or None where processing failed.
+    """
+    try:
+        records = []
+        for video, download, future in jobs:
+            try:
+                result = future.result()
+            except Exception as e:
+                result = PipelineResult(has_bird=False, error=str(e))
+            records.append(process_video_from_api(video, download, result, output_dir))
+        return records
+
+    finally:
+        # Make sure no temporary files are left behind if interrupted
+        for job in jobs:
+            discard_video_job(job)
+
+
+def process_videos_from_api(
+    jobs: list[VideoJob],
+    pipeline: DetectionPipeline,
+    output_dir: Path | None = None,
+) -> list[VideoRecord | None]:
+    """Run detection for a batch of videos whose frames have been extracted.
+
+    Args:
+        jobs: VideoJobs from extract_in_background.
         pipeline: Detection pipeline instance.
-        db: Database instance.
         output_dir: Optional directory to save videos with birds.
 
     Returns:
-        True if processing succeeded, False otherwise.
+        VideoRecord to store for each job, or None where processing failed.
+    """
+    try:
+        extractions = []
+        results: list[PipelineResult | None] = []
+        for _, _, extraction in jobs:
+            try:
+                extractions.append(extraction.result())
+                results.append(None)
+            except Exception as e:
+                results.append(PipelineResult(has_bird=False, error=str(e)))
+
+        # Run detection for all videos in the batch together
+        try:
+            detected = iter(pipeline.detect(extractions))
+        except Exception as e:
+            detected = itertools.repeat(PipelineResult(has_bird=False, error=str(e)))
+        results = [r if r is not None else next(detected) for r in results]
+
+        return [
+            process_video_from_api(video, download, result, output_dir)
+            for (video, download, _), result in zip(jobs, results)
+        ]
+
+    finally:
+        # Make sure no temporary files are left behind if interrupted
+        for job in jobs:
+            discard_video_job(job)
+
+
+def process_video_from_api(
+    video: MediaItem,
+    download: Future[Path],
+    result: PipelineResult,
+    output_dir: Path | None = None,
+) -> VideoRecord | None:
+    """Handle the pipeline result for a single video from the API.
+
+    Args:
+        video: MediaItem that was processed.
+        download: Future resolving to the downloaded video's temporary path.
+        result: Pipeline result for the video.
+        output_dir: Optional directory to save videos with birds.
+
+    Returns:
+        VideoRecord to store if processing succeeded, None otherwise.
     """
     video_path = None
     keep_video = False
 
     try:
-        # Download video
-        logger.info(f"Downloading: {video.name}")
-        video_path = api_client.download_video(video.proxy_url)
-
-        # Run through pipeline
-        logger.info(f"Processing: {video.name}")
-        result = pipeline.process(video_path)
+        video_path = download.result()
 
         if not result.success:
-            logger.error(f"Pipeline failed for {video.name}: {result.error}")
-            return False
+            logger.error("Pipeline failed for %s: %s", video.name, result.error)
+            return None
 
-        # Store result
-        db.insert_result(
+        record = VideoRecord(
             filename=video.name,
             path=video.path,
+            processed_at=datetime.now().isoformat(),
             has_bird=result.has_bird,
             confidence=result.confidence,
             bird_area_percent=result.bird_area_percent,
@@ -105,94 +409,151 @@ def process_video_from_api(
 
         if result.has_bird:
             logger.info(
-                f"Bird detected in {video.name}: "
-                f"confidence={result.confidence:.2f}, "
-                f"area={result.bird_area_percent:.1f}%"
+                "Bird detected in %s: confidence=%.2f, area=%.1f%%",
+                video.name,
+                result.confidence,
+                result.bird_area_percent,
             )
             # Save video to output directory
             if output_dir:
                 dest_path = output_dir / video.download_filename
-                shutil.copy2(video_path, dest_path)
-                logger.info(f"Saved to: {dest_path}")
-                keep_video = False  # We copied it, so we can delete the temp file
+                # A rename when on the same filesystem, otherwise a copy
+                shutil.move(video_path, dest_path)
+                logger.info("Saved to: %s", dest_path)
+                keep_video = True  # Moved, so there's no temp file to delete
         else:
-            logger.info(f"No bird in {video.name}")
+            logger.info("No bird in %s", video.name)
 
-        return True
+        return record
 
     except Exception as e:
-        logger.error(f"Failed to process {video.name}: {e}")
-        return False
+        logger.error("Failed to process %s: %s", video.name, e)
+        return None
 
     finally:
         # Clean up downloaded video
-        if video_path and video_path.exists() and not keep_video:
+        if video_path and not keep_video:
             video_path.unlink(missing_ok=True)
 
 
-def run_batch(config, pipeline: DetectionPipeline) -> int:
+def run_batch(config, pipeline: DetectionPipeline | None) -> int:
     """Run batch processing of videos from the API.
 
     Args:
         config: Application configuration.
-        pipeline: Detection pipeline instance.
+        pipeline: Detection pipeline instance, or None if detection runs in
+            worker processes (detection.processes > 1).
 
     Returns:
         Exit code.
     """
-    logger.info(f"Using API: {config.api.base_url}")
-    logger.info(f"Using database: {config.database.path}")
-    logger.info(f"Using model: {config.detection.model}")
+    logger.info("Using API: %s", config.api.base_url)
+    logger.info("Concurrent downloads: %d", config.api.concurrent_downloads)
+    if pipeline is None:
+        logger.info("Detection processes: %d", config.detection.processes)
+    else:
+        logger.info("Frame extraction workers: %d", config.detection.extract_workers)
+    logger.info("Using database: %s", config.database.path)
+    logger.info("Using model: %s", config.detection.model)
 
     # Set up output directory if configured
     output_dir = None
     if config.outputs.directory:
         output_dir = Path(config.outputs.directory)
         output_dir.mkdir(parents=True, exist_ok=True)
-        logger.info(f"Saving bird videos to: {output_dir}")
+        logger.info("Saving bird videos to: %s", output_dir)
 
     with Database(config.database.path) as db:
-        with ApiClient(config.api.base_url, timeout=config.api.timeout) as api:
+        with ApiClient(
+            config.api.base_url,
+            timeout=config.api.timeout,
+            concurrent_downloads=config.api.concurrent_downloads,
+            cache_file=config.api.cache_file,
+            download_dir=config.api.download_dir,
+        ) as api:
             # Fetch video list
             logger.info("Fetching video list from API...")
             try:
                 videos = api.get_videos()
             except Exception as e:
-                logger.error(f"Failed to fetch videos: {e}")
+                logger.error("Failed to fetch videos: %s", e)
                 return 1
 
-            logger.info(f"Found {len(videos)} videos")
+            logger.info("Found %d videos", len(videos))
 
             # Filter to unprocessed videos
-            unprocessed = [v for v in videos if not db.is_processed(v.name)]
-            logger.info(f"Videos to process: {len(unprocessed)}")
+            processed = db.get_processed_filenames()
+            unprocessed = [v for v in videos if v.name not in processed]
+            logger.info("Videos to process: %d", len(unprocessed))
 
             if not unprocessed:
                 logger.info("No new videos to process")
                 return 0
 
-            # Process each video
+            # Process each video: downloads and frame extraction run in
+            # background threads, detection runs here in batches (or all of
+            # it runs in worker processes)
             success_count = 0
             fail_count = 0
+            pending: list[VideoRecord] = []
+            frames_per_video = max(1, len(config.detection.frame_times))
+            videos_per_batch = max(1, config.detection.batch_size // frames_per_video)
 
-            for i, video in enumerate(unprocessed, 1):
-                logger.info(f"Processing [{i}/{len(unprocessed)}]: {video.name}")
-
-                if process_video_from_api(video, api, pipeline, db, output_dir):
-                    success_count += 1
-                else:
-                    fail_count += 1
+            try:
+                with closing(api.download_videos(unprocessed)) as downloads:
+                    if pipeline is None:
+                        batches = detect_in_processes(downloads, config)
+                    else:
+                        batches = extract_in_background(
+                            downloads,
+                            pipeline,
+                            workers=config.detection.extract_workers,
+                            max_batch=videos_per_batch,
+                        )
+                    with closing(batches):
+                        i = 0
+                        for batch in batches:
+                            for video, _, _ in batch:
+                                i += 1
+                                logger.info(
+                                    "Processing [%d/%d]: %s",
+                                    i,
+                                    len(unprocessed),
+                                    video.name,
+                                )
+
+                            if pipeline is None:
+                                records = process_videos_in_workers(batch, output_dir)
+                            else:
+                                records = process_videos_from_api(
+                                    batch, pipeline, output_dir
+                                )
+                            for record in records:
+                                if record is None:
+                                    fail_count += 1
+                                else:
+                                    success_count += 1
+                                    pending.append(record)
+
+                            if len(pending) >= config.database.batch_size:
+                                db.insert_results(pending)
+                                pending = []
+            finally:
+                # Write any buffered results, even if interrupted
+                db.insert_results(pending)
 
             # Print summary
             stats = db.get_stats()
             logger.info("=" * 50)
             logger.info("Processing complete")
             logger.info(
-                f"  Processed this run: {success_count} success, {fail_count} failed"
+                "  Processed this run: %d success, %d failed",
+                success_count,
+                fail_count,
             )
-            logger.info(f"  Total in database: {stats['total']}")
-            logger.info(f"  Videos with birds: {stats['birds_found']}")
-            logger.info(f"  Videos without birds: {stats['no_birds']}")
+            logger.info("  Total in database: %d", stats["total"])
+            logger.info("  Videos with birds: %d", stats["birds_found"])
+            logger.info("  Videos without birds: %d", stats["no_birds"])
 
     return 0
 
@@ -235,24 +596,18 @@ def main() -> int:
     try:
         config = load_config(args.config)
     except (FileNotFoundError, ValueError) as e:
-        logger.error(f"Configuration error: {e}")
+        logger.error("Configuration error: %s", e)
         return 1
 
-    # Create pipeline
-    pipeline = DetectionPipeline(
-        model_path=config.detection.model,
-        confidence_threshold=config.detection.confidence_threshold,
-        frame_times=config.detection.frame_times,
-        min_area_percent=config.detection.min_area_percent,
-        max_area_percent=config.detection.max_area_percent,
-    )
-
     # Test mode: process a single local video
     if args.test_video:
-        return test_video(args.test_video, pipeline)
+        return test_video(args.test_video, create_pipeline(config))
 
-    # Batch mode: process videos from API
-    return run_batch(config, pipeline)
+    # Batch mode: process videos from API. With worker processes, each
+    # worker creates its own pipeline, so none is needed here.
+    if config.detection.processes > 1:
+        return run_batch(config, None)
+    return run_batch(config, create_pipeline(config))
 
 
 if __name__ == "__main__":
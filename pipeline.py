@@ -4,11 +4,21 @@ This module encapsulates the video-to-detection pipeline, independent of
 any specific video source (API, local file, etc.).
 """
 
+from collections import OrderedDict
 from dataclasses import dataclass
 from pathlib import Path
 
-from detector import BirdDetector
-from frame_extractor import extract_frames
+import numpy as np
+
+from detector import BirdDetector, DetectionResult
+from frame_extractor import MultiFrameExtractionResult, extract_frames
+
+# Side length of the grayscale thumbnail that frame hashes are computed from;
+# hashes have HASH_SIZE**2 bits
+HASH_SIZE = 16
+
+# Number of recent bird-free frame hashes remembered for skip_similar
+HASH_CACHE_SIZE = 256
 
 
 @dataclass
@@ -46,6 +56,14 @@ class DetectionPipeline:
         frame_times: list[float] | None = None,
         min_area_percent: float | None = None,
         max_area_percent: float | None = None,
+        batch_size: int = 8,
+        device: str | None = None,
+        half: bool | None = None,
+        hwaccel: str | None = None,
+        backend: str = "torch",
+        skip_similar: int | None = None,
+        input_size: int | list[int] | None = None,
+        threads: int | None = None,
     ):
         """Initialize the pipeline.
 
@@ -55,14 +73,35 @@ class DetectionPipeline:
             frame_times: Target frame times in seconds (uses 50% if video shorter).
             min_area_percent: Minimum bird area as % of frame (None = no minimum).
             max_area_percent: Maximum bird area as % of frame (None = no maximum).
+            batch_size: Maximum number of frames per inference call.
+            device: Device to run inference on (None = pick automatically).
+            half: Use FP16 inference (None = whenever CUDA is available).
+            hwaccel: ffmpeg hardware decoding method (None = software).
+            backend: Inference backend ("torch", "onnx" or "engine").
+            skip_similar: Skip detection for frames whose hash differs from a
+                recent bird-free frame's by at most this many bits (None =
+                always run detection).
+            input_size: Model input size, as a side length or [height, width]
+                (None = the model's default).
+            threads: Maximum number of CPU threads for inference (None = all
+                cores).
         """
         self.detector = BirdDetector(
             model_path=model_path,
             confidence_threshold=confidence_threshold,
             min_area_percent=min_area_percent,
             max_area_percent=max_area_percent,
+            batch_size=batch_size,
+            device=device,
+            half=half,
+            backend=backend,
+            input_size=input_size,
+            threads=threads,
         )
         self.frame_times = frame_times if frame_times is not None else [6.0]
+        self.hwaccel = hwaccel
+        self.skip_similar = skip_similar
+        self._bird_free_hashes: OrderedDict[int, None] = OrderedDict()
 
     def process(self, video_path: Path) -> PipelineResult:
         """Process a video file through the detection pipeline.
@@ -77,49 +116,9 @@ class DetectionPipeline:
         Returns:
             PipelineResult with detection results or error info.
         """
-        frame_paths = []
-
         try:
-            # Extract frames
-            extraction = extract_frames(video_path, target_times=self.frame_times)
-            frame_paths = [f.frame_path for f in extraction.frames]
-
-            # Run detection on each frame, track best result
-            best_detection = None
-            best_frame_time = None
-
-            for frame_result in extraction.frames:
-                detection = self.detector.detect(frame_result.frame_path)
-
-                if detection.has_bird:
-                    # Keep the detection with the largest bird
-                    if best_detection is None or (
-                        detection.bird_area_percent is not None
-                        and (
-                            best_detection.bird_area_percent is None
-                            or detection.bird_area_percent
-                            > best_detection.bird_area_percent
-                        )
-                    ):
-                        best_detection = detection
-                        best_frame_time = frame_result.frame_time
-
-            if best_detection is not None:
-                return PipelineResult(
-                    has_bird=True,
-                    confidence=best_detection.confidence,
-                    bird_area_percent=best_detection.bird_area_percent,
-                    video_duration=extraction.duration,
-                    frame_time=best_frame_time,
-                )
-            else:
-                return PipelineResult(
-                    has_bird=False,
-                    video_duration=extraction.duration,
-                    frame_time=extraction.frames[0].frame_time
-                    if extraction.frames
-                    else None,
-                )
+            extraction = self.extract(video_path)
+            return self.detect([extraction])[0]
 
         except Exception as e:
             return PipelineResult(
@@ -127,8 +126,159 @@ class DetectionPipeline:
                 error=str(e),
             )
 
-        finally:
-            # Clean up extracted frames
-            for frame_path in frame_paths:
-                if frame_path.exists():
-                    frame_path.unlink(missing_ok=True)
+    def extract(self, video_path: Path) -> MultiFrameExtractionResult:
+        """Extract the configured frames from a video.
+
+        This is the first stage of process(). It doesn't use the detector,
+        so it is safe to run for several videos in parallel threads.
+
+        Args:
+            video_path: Path to the video file.
+
+        Returns:
+            MultiFrameExtractionResult to pass to detect().
+
+        Raises:
+            FrameExtractionError: If extraction fails.
+        """
+        return extract_frames(
+            video_path, target_times=self.frame_times, hwaccel=self.hwaccel
+        )
+
+    def detect(
+        self, extractions: list[MultiFrameExtractionResult]
+    ) -> list[PipelineResult]:
+        """Detect birds in frames extracted from one or more videos.
+
+        This is the second stage of process(). The frames of all given
+        videos are run through the detector together. If skip_similar is
+        set, frames that look like a recent bird-free frame are assumed to
+        have no bird and aren't run through the detector at all.
+
+        Args:
+            extractions: Results of extract(), one per video.
+
+        Returns:
+            PipelineResult for each video, in the same order as extractions.
+
+        Raises:
+            Exception: If detection fails.
+        """
+        frames = [f.frame for x in extractions for f in x.frames]
+
+        if self.skip_similar is None:
+            # Run detection on all frames at once
+            detections = iter(self.detector.detect_batch(frames))
+        else:
+            detections = iter(self._detect_unless_similar(frames))
+
+        return [
+            self._best_result(extraction, [next(detections) for _ in extraction.frames])
+            for extraction in extractions
+        ]
+
+    def _detect_unless_similar(self, frames: list[np.ndarray]) -> list[DetectionResult]:
+        """Detect birds in frames, skipping those like a recent bird-free frame.
+
+        Args:
+            frames: The frames to check.
+
+        Returns:
+            DetectionResult for each frame, in the same order as frames.
+        """
+        hashes = [_frame_hash(frame) for frame in frames]
+        results = [DetectionResult(has_bird=False) for _ in frames]
+        to_detect = [
+            i
+            for i, frame_hash in enumerate(hashes)
+            if not any(
+                (frame_hash ^ known).bit_count() <= self.skip_similar
+                for known in self._bird_free_hashes
+            )
+        ]
+
+        detections = self.detector.detect_batch([frames[i] for i in to_detect])
+        for i, detection in zip(to_detect, detections):
+            results[i] = detection
+            if not detection.has_bird:
+                self._bird_free_hashes[hashes[i]] = None
+                self._bird_free_hashes.move_to_end(hashes[i])
+                if len(self._bird_free_hashes) > HASH_CACHE_SIZE:
+                    self._bird_free_hashes.popitem(last=False)
+
+        return results
+
+    @staticmethod
+    def _best_result(
+        extraction: MultiFrameExtractionResult,
+        detections: list[DetectionResult],
+    ) -> PipelineResult:
+        """Combine the detections for one video's frames into a result.
+
+        Args:
+            extraction: Frames extracted from the video.
+            detections: Detection result for each frame.
+
+        Returns:
+            PipelineResult for the frame with the largest bird, if any.
+        """
+        best_detection = None
+        best_frame_time = None
+
+        for frame_result, detection in zip(extraction.frames, detections):
+            if detection.has_bird:
+                # Keep the detection with the largest bird
+                if best_detection is None or (
+                    detection.bird_area_percent is not None
+                    and (
+                        best_detection.bird_area_percent is None
+                        or detection.bird_area_percent
+                        > best_detection.bird_area_percent
+                    )
+                ):
+                    best_detection = detection
+                    best_frame_time = frame_result.frame_time
+
+        if best_detection is not None:
+            return PipelineResult(
+                has_bird=True,
+                confidence=best_detection.confidence,
+                bird_area_percent=best_detection.bird_area_percent,
+                video_duration=extraction.duration,
+                frame_time=best_frame_time,
+            )
+        else:
+            return PipelineResult(
+                has_bird=False,
+                video_duration=extraction.duration,
+                frame_time=extraction.frames[0].frame_time
+                if extraction.frames
+                else None,
+            )
+
+
+def _frame_hash(frame: np.ndarray) -> int:
+    """Compute a perceptual (average) hash of a frame.
+
+    The frame is shrunk to a HASH_SIZE x HASH_SIZE grayscale thumbnail, and
+    each bit of the hash records whether one thumbnail pixel is brighter
+    than the thumbnail's mean. Similar-looking frames get hashes that
+    differ in few bits.
+
+    Args:
+        frame: The frame (height x width x 3).
+
+    Returns:
+        The hash, as an integer of HASH_SIZE**2 bits.
+    """
+    # Sample every 4th pixel; plenty for a thumbnail and much cheaper
+    gray = frame[::4, ::4].mean(axis=2)
+    height = gray.shape[0] // HASH_SIZE * HASH_SIZE
+    width = gray.shape[1] // HASH_SIZE * HASH_SIZE
+    thumbnail = (
+        gray[:height, :width]
+        .reshape(HASH_SIZE, height // HASH_SIZE, HASH_SIZE, width // HASH_SIZE)
+        .mean(axis=(1, 3))
+    )
+    bits = np.packbits(thumbnail > thumbnail.mean())
+    return int.from_bytes(bits.tobytes(), "big")